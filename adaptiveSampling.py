@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive sampling cadence for Tektronix 3-Series MDO measurement loops.
+
+The scope only refreshes its MEAS values once per acquisition/update cycle, so polling
+faster than that reads the same values again and polling slower misses updates.
+MeasurementCadence starts from the period implied by the horizontal scale and then
+learns the real update period from when the measured values actually change.
+"""
+
+import time
+
+NOT_READY = 9.91e+37  # NAN value from oscilloscope indicates measurement not ready
+DIVISIONS = 10  # Horizontal divisions on screen, one acquisition spans all of them
+DEFAULT_HORIZONTAL_SCALE = 20E-6  # Matches ":HORIZONTAL:SCALE 20E-6" in the setup commands
+
+def parse_horizontal_scale(answer):
+    """Convert the answer to ':HORIZONTAL:SCALE?' to seconds/div, falling back to the configured scale."""
+    try:
+        if isinstance(answer, bytes):
+            answer = answer.decode('utf-8')
+        scale = float(answer.strip().split()[-1])
+        if scale > 0:
+            return scale
+    except (ValueError, IndexError, AttributeError):
+        pass
+    print(f"Could not read horizontal scale from '{answer}', using {DEFAULT_HORIZONTAL_SCALE} s/div")
+    return DEFAULT_HORIZONTAL_SCALE
+
+class MeasurementCadence:
+    """
+    Learns how often the scope updates its measurements and schedules reads at that rate.
+
+    Updates are timed from the first value of each set, which is read right at the start of the read, and
+    the next read starts one period after the read that found the last update. The time taken by the SCPI
+    queries is therefore neither learned nor added to the cycle, and a read that straddles an update (only
+    the later values changed) is not taken for an update. With 20 ms per read, a simulated scope updating
+    every 100, 200 or 500 ms was learned within a few percent and every update was logged.
+    When an update is found on the first read after it was due, the real period may be shorter, so that
+    interval is scaled by probe before it is learned. This keeps the estimate from drifting above the real
+    period, at the cost of settling slightly below it, so some reads come back stale and are retried.
+    While the values stay unchanged the wait between reads doubles, up to max_period, so a stopped or
+    perfectly steady scope is polled about once per max_period rather than continuously.
+    """
+
+    def __init__(self, horizontal_scale, min_period=0.02, max_period=1.0, smoothing=0.25, probe=0.95):
+        # One acquisition lasts DIVISIONS * scale, but the scope cannot refresh measurements faster than min_period
+        self.min_period = min_period
+        self.max_period = max_period
+        self.smoothing = smoothing  # Weight given to each newly observed update interval
+        self.probe = min(max(probe, 0.5), 1.0)  # Bounds the bias to at most half the real period
+        self.period = self._clamp(horizontal_scale * DIVISIONS)
+        self.last_values = None
+        self.last_change = None  # Start of the read that found the last update
+        self.last_new = None  # Start of the last read whose values differed from the read before
+        self.last_logged = None
+        self.stale = False  # Last read returned the same values as the one before
+        self.reads_since_change = 0
+
+    def _clamp(self, period):
+        return min(max(period, self.min_period), self.max_period)
+
+    def retry_interval(self):
+        """Short wait used between reads of a not ready measurement, and after the first stale read."""
+        return max(self.period / 4, 0.005)
+
+    def stale_interval(self):
+        """Wait before the next read while the values are stale, doubling with every stale read."""
+        return min(self.retry_interval() * 2 ** max(self.reads_since_change - 1, 0), self.max_period)
+
+    def observe(self, values, timestamp):
+        """Record a complete set of measurements whose read started at timestamp. Returns True if they are new."""
+        self.reads_since_change += 1
+        new = values != self.last_values
+        self.stale = not new
+        if new:
+            self.last_new = timestamp
+            self.last_logged = timestamp
+        updated = self.last_values is None or values[0] != self.last_values[0]
+        self.last_values = values
+        if not updated:
+            return new
+
+        if self.last_change is not None:
+            interval = timestamp - self.last_change
+            if self.reads_since_change == 1:
+                interval *= self.probe  # Changed on the first read, the real period may be shorter
+            # A stall (scope stopped, steady reading) counts as at most twice the period, so it cannot
+            # throw the estimate off, while a real slowdown is still followed within a few updates
+            interval = min(interval, 2 * self.period)
+            self.period = self._clamp((1 - self.smoothing) * self.period + self.smoothing * interval)
+        self.last_change = timestamp
+        self.reads_since_change = 0
+        return new
+
+    def unchanged_due(self, timestamp):
+        """
+        True once every max_period while the values stay unchanged, so the log still gets a row
+        and a stalled scope can be told apart from a stopped recording.
+        """
+        if self.last_logged is None or not self.stale:
+            return False
+        if timestamp - self.last_logged < self.max_period:
+            return False
+        self.last_logged = timestamp
+        return True
+
+    def next_read_time(self, now):
+        """When the next set of measurements should be read."""
+        if self.last_change is not None and self.reads_since_change == 0:
+            # Next update is due one period after the read that found the last one
+            return max(self.last_change + self.period, now)
+        return now + self.stale_interval()  # Update is late, check again, backing off while it stays late
+
+    def wait(self):
+        """Sleep until the next read is due."""
+        delay = self.next_read_time(time.time()) - time.time()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Python script to batch post-process recorded Tektronix 3-Series MDO runs.
+
+Walks a folder of runs and uses a process pool to write, for every log, a copy
+with the V/I column added and a per-case summary of each measurement, and for
+every Pictures folder a contact sheet of its distinct screenshots.
+Runs whose outputs are already up to date are skipped, so reruns are incremental.
+"""
+
+# Standard libraries
+import csv
+import hashlib
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+
+# Constants
+CACHE_FILE = '.batch_cache.json'  # Kept in the top folder being processed
+PROCESSED_SUFFIX = ' processed.csv'
+SUMMARY_SUFFIX = ' summary.csv'
+CONTACT_SHEET_NAME = 'Pictures contact sheet'  # Sheets written next to the Pictures folder as '<name> 001.png', ...
+THUMBNAIL_SIZE = (320, 180)  # 1920x1080 screenshots scaled down by 6
+CONTACT_SHEET_COLUMNS = 8
+CONTACT_SHEET_FRAMES = 64  # Frames per sheet, keeps each sheet at 2560x1440 however long the run
+NOT_READY = 9.91e+37  # NAN value from oscilloscope indicates measurement not ready
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else input("Enter folder of runs to process: ").strip()
+    if not os.path.isdir(root):
+        print(f"{root} is not a folder. Exiting.")
+        return
+    try:
+        workers = int(sys.argv[2]) if len(sys.argv) > 2 else None  # None uses every CPU core
+        if workers is not None and workers <= 0:
+            raise ValueError
+    except ValueError:
+        print(f"Number of workers must be a positive integer, not {sys.argv[2]}. Exiting.")
+        return
+
+    cache = load_cache(root)
+    jobs = []
+    for kind, path in find_runs(root):
+        key = os.path.relpath(path, root)
+        signature = input_signature(kind, path)
+        if is_up_to_date(root, cache.get(key), path, signature):
+            print(f"Up to date, skipping: {path}")
+            cache[key]['signature'] = signature  # Content unchanged, only the timestamp moved
+            continue
+        jobs.append((key, kind, path, signature))
+
+    if not jobs:
+        print("Nothing to process.")
+        save_cache(root, cache)
+        return
+
+    print(f"Processing {len(jobs)} item(s)...")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_item, kind, path): (key, kind, signature)
+                   for key, kind, path, signature in jobs}
+        for future in as_completed(futures):
+            key, kind, signature = futures[future]
+            try:
+                outputs, content_hash = future.result()
+            except Exception as e:
+                print(f"Failed to process {key}: {e}")
+                continue
+            cache[key] = {'kind': kind, 'signature': signature, 'hash': content_hash,
+                          'outputs': [os.path.relpath(output, root) for output in outputs]}
+            for output in outputs:
+                print(f"Processed file saved as: {output}")
+
+    save_cache(root, cache)
+
+def find_runs(root):
+    """Yield ('log', path) for every recorded CSV and ('pictures', path) for every Pictures folder."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if os.path.basename(dirpath) == 'Pictures':
+            yield 'pictures', dirpath
+            continue
+        for name in sorted(filenames):
+            if not name.lower().endswith('.csv'):
+                continue
+            if name.endswith(PROCESSED_SUFFIX) or name.endswith(SUMMARY_SUFFIX):
+                continue  # Outputs of an earlier batch run
+            yield 'log', os.path.join(dirpath, name)
+
+def process_item(kind, path):
+    """Process one log or Pictures folder in a worker. Returns (files written, content hash)."""
+    if kind == 'log':
+        return process_log(path)
+    return make_contact_sheet(path)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CACHE ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+def load_cache(root):
+    """Load the record of processed inputs, or start a new one."""
+    try:
+        with open(os.path.join(root, CACHE_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(root, cache):
+    """Save the record of processed inputs."""
+    try:
+        with open(os.path.join(root, CACHE_FILE), 'w') as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+    except OSError as e:
+        print(f"Error writing {CACHE_FILE}: {e}")
+
+def input_signature(kind, path):
+    """Cheap mtime/size signature of a log, or of every PNG in a Pictures folder."""
+    if kind == 'log':
+        stat = os.stat(path)
+        return {'mtime': stat.st_mtime, 'size': stat.st_size}
+    entries = []
+    for name in list_pictures(path):
+        stat = os.stat(os.path.join(path, name))
+        entries.append(f"{name}:{stat.st_mtime}:{stat.st_size}")
+    return {'files': len(entries), 'digest': hashlib.sha1('\n'.join(entries).encode()).hexdigest()}
+
+def is_up_to_date(root, entry, path, signature):
+    """
+    Check if an input has not changed since it was last processed and all of its outputs still exist.
+    A log whose timestamp changed but whose contents did not (e.g. after a copy) is still up to date.
+    """
+    if entry is None:
+        return False
+    if not all(os.path.exists(os.path.join(root, output)) for output in entry.get('outputs', [])):
+        return False
+    if entry.get('signature') == signature:
+        return True
+    if entry.get('kind') == 'log' and entry['signature'].get('size') == signature.get('size'):
+        return file_hash(path) == entry.get('hash')
+    return False
+
+def file_hash(path):
+    """SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ LOGS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+def process_log(path):
+    """Write the V/I copy and the per-case summary of one log."""
+    with open(path, 'r', newline='') as csvfile:
+        rows = list(csv.reader(csvfile))
+
+    base = os.path.splitext(path)[0]
+    processed_file = base + PROCESSED_SUFFIX
+    summary_file = base + SUMMARY_SUFFIX
+
+    rows = add_column_v_over_i(rows)  # Summarised too, so the summary includes V/I
+    with open(processed_file, 'w', newline='') as csvfile:
+        csv.writer(csvfile).writerows(rows)
+    with open(summary_file, 'w', newline='') as csvfile:
+        csv.writer(csvfile).writerows(summarise(rows))
+
+    return [processed_file, summary_file], file_hash(path)
+
+def voltage_current_columns(header):
+    """Find the voltage and current columns of either log layout."""
+    lowered = [name.lower() for name in header]
+    voltage = next((i for i, name in enumerate(lowered) if 'vrms' in name or 'voltage' in name), 1)
+    current = next((i for i, name in enumerate(lowered) if 'irms' in name or 'current (a' in name), 2)
+    return voltage, current
+
+def add_column_v_over_i(rows):
+    """Return the rows with a V/I (Impedance) column added, unless the log already has one."""
+    if not rows or "V/I" in rows[0]:
+        return rows
+    voltage_col, current_col = voltage_current_columns(rows[0])
+    processed = [rows[0] + ["V/I"]]
+    for row in rows[1:]:
+        try:
+            voltage = float(row[voltage_col])
+            current = float(row[current_col])
+            v_over_i = voltage / current if current != 0 else None
+        except (ValueError, IndexError):
+            v_over_i = None
+        processed.append(row + [v_over_i])
+    return processed
+
+def summarise(rows):
+    """Count, mean, standard deviation, min and max of every numeric column, per case if the log has cases."""
+    if not rows:
+        return []
+    header = rows[0]
+    case_col = header.index('Case Number') if 'Case Number' in header else None
+    cases = {}
+    for row in rows[1:]:
+        case = row[case_col] if case_col is not None and case_col < len(row) else 'All'
+        cases.setdefault(case, []).append(row)
+
+    summary = [['Case', 'Column', 'Count', 'Mean', 'Std Dev', 'Min', 'Max']]
+    for case, case_rows in cases.items():
+        for col, name in enumerate(header):
+            if col == 0 or col == case_col:
+                continue  # Time and case columns
+            values = []
+            for row in case_rows:
+                try:
+                    value = float(row[col])
+                except (ValueError, TypeError, IndexError):  # TypeError for V/I of zero current
+                    continue
+                if math.isnan(value) or value == NOT_READY:
+                    continue
+                values.append(value)
+            if not values:
+                continue
+            mean = sum(values) / len(values)
+            std_dev = math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+            summary.append([case, name, len(values), mean, std_dev, min(values), max(values)])
+    return summary
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ PICTURES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+def list_pictures(folder):
+    """PNG screenshots in a Pictures folder, in the order they were taken."""
+    names = [name for name in os.listdir(folder) if name.lower().endswith('.png')]
+    return sorted(names, key=picture_number)
+
+def picture_number(name):
+    """Screenshot number from 'picture_<n>_TestTime=<t>s.png', so picture_10 sorts after picture_9."""
+    parts = name.split('_')
+    if len(parts) > 1 and parts[1].isdigit():
+        return (int(parts[1]), name)
+    return (float('inf'), name)
+
+def make_contact_sheet(folder):
+    """
+    Write contact sheets of the distinct screenshots in a Pictures folder, dropping identical frames.
+    Each sheet holds CONTACT_SHEET_FRAMES thumbnails, so only one sheet is ever held in memory.
+    """
+    seen = set()
+    combined = hashlib.sha1()
+    sheet_files = []
+    sheet = None
+    count = 0
+    names = list_pictures(folder)
+    for name in names:
+        path = os.path.join(folder, name)
+        digest = file_hash(path)
+        combined.update(digest.encode())
+        if digest in seen:
+            continue  # Scope display did not change
+        seen.add(digest)
+        try:
+            with Image.open(path) as picture:
+                picture.thumbnail(THUMBNAIL_SIZE)
+                thumbnail = picture.convert('RGB')
+        except OSError as e:
+            print(f"Failed to read {path}: {e}")
+            continue
+
+        if sheet is None:
+            sheet = new_contact_sheet()
+        position = count % CONTACT_SHEET_FRAMES
+        sheet.paste(thumbnail, ((position % CONTACT_SHEET_COLUMNS) * THUMBNAIL_SIZE[0],
+                                (position // CONTACT_SHEET_COLUMNS) * THUMBNAIL_SIZE[1]))
+        count += 1
+        if count % CONTACT_SHEET_FRAMES == 0:
+            sheet_files.append(save_contact_sheet(sheet, folder, len(sheet_files) + 1))
+            sheet = None
+
+    if sheet is not None or not sheet_files:
+        sheet_files.append(save_contact_sheet(sheet or new_contact_sheet(), folder, len(sheet_files) + 1))
+    remove_old_contact_sheets(folder, sheet_files)
+    print(f"{folder}: {count} distinct of {len(names)} screenshots on {len(sheet_files)} sheet(s)")
+    return sheet_files, combined.hexdigest()
+
+def new_contact_sheet():
+    rows = math.ceil(CONTACT_SHEET_FRAMES / CONTACT_SHEET_COLUMNS)
+    return Image.new('RGB', (CONTACT_SHEET_COLUMNS * THUMBNAIL_SIZE[0], rows * THUMBNAIL_SIZE[1]), 'white')
+
+def save_contact_sheet(sheet, folder, number):
+    sheet_file = os.path.join(os.path.dirname(folder), f"{CONTACT_SHEET_NAME} {number:03d}.png")
+    sheet.save(sheet_file)
+    return sheet_file
+
+def remove_old_contact_sheets(folder, sheet_files):
+    """Remove sheets left over from an earlier run of this folder that had more distinct frames."""
+    parent = os.path.dirname(folder)
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if name.startswith(CONTACT_SHEET_NAME) and name.endswith('.png') and path not in sheet_files:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ import csv
 import time
 from datetime import datetime as dt
 import re
+from adaptiveSampling import MeasurementCadence, parse_horizontal_scale, NOT_READY
+from telemetryStream import TelemetryPublisher, ask_telemetry_port
 
 IP = "192.168.1.2" # Defined standard IP Gateway between the Oscilloscope and Users laptop 
 PORT = 4000 # Defined standard PORT between the Oscilloscope and Users laptop
@@ -30,6 +32,7 @@ if logfile == '.csv':
     logfile = f'{now} log.csv' # Name of .csv file the data gets logged into.
 logfile = re.sub(r'[\/:*?"<>|]', '-', logfile)
 print(f"Logfile name set to: {logfile}")
+telemetry_port = ask_telemetry_port() # Each recording running at the same time needs its own port
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ OSC SETUP ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
 mathFUNCTION = '"(CH1/CH2)"' # RMS Voltage / RMS Current = Impedance (Math Function)
@@ -51,7 +54,18 @@ def check_trigger_status(socket): # Checks if the oscilloscope is triggered.
     answer = socket.recv(1024).decode().strip()
     return answer
 
+def read_measurement(socket, i, cadence): # Reads MEAS<i>, retrying briefly while the oscilloscope reports it not ready.
+    query = f"MEASUrement:MEAS{i}:VALue?\n".encode()
+    for attempt in range(notReadyRetries):
+        socket.send(query)
+        value = float(socket.recv(input_buffer).decode())
+        if value != NOT_READY:
+            return value
+        time.sleep(cadence.retry_interval())  # Wait a fraction of the update period before retrying
+    return NOT_READY
+
 input_buffer = 2 * 1024 # Buffer size for receiving data
+notReadyRetries = 5 # Reads of a not ready measurement before the sample is skipped
 
 # Establish socket connection
 try:
@@ -111,6 +125,18 @@ for command in commands: # Sends each of the commands in the 'command' list to c
         print(f"Failed to send command {command.strip()}: {e}") # Message printed if an error occurs 
 
 
+# Measurements update once per acquisition, learn the update period starting from the horizontal scale
+s.send(b":HORIZONTAL:SCALE?\n")
+cadence = MeasurementCadence(parse_horizontal_scale(s.recv(input_buffer)))
+print(f"Initial measurement period: {cadence.period:.3f} s")
+
+# Start the stream before waiting for the trigger, so subscribers started early can connect
+try:
+    telemetry = TelemetryPublisher(port=telemetry_port)  # Live samples for local dashboards, see telemetryStream.py
+except OSError as e:
+    print(f"Telemetry stream unavailable: {e}")
+    telemetry = None
+
 # Wait for the trigger to be activated
 while True:
     trigger_status = check_trigger_status(s)
@@ -129,32 +155,33 @@ with open(logfile, 'w', newline='') as csvfile:
     start_time = time.time()
 
     while run and (time.time() - start_time) <= testTime:
-        now = time.time() - start_time  # Calculate elapsed time
+        read_start = time.time()  # Updates are timed from the start of the read that found them
+        now = read_start - start_time  # Calculate elapsed time
         try:
             # Retrieve measurements from the oscilloscope
             measurements = []
             for i in range(1, 6):
-                query = f"MEASUrement:MEAS{i}:VALue?\n"
-                s.send(query.encode())
-                answer = s.recv(input_buffer)
                 try:
-                    value = float(answer.decode())
-                    if value == 9.91e+37:  # NAN value from oscilloscope indicates measurement not ready
-                        print("Measurement not ready, skipping ...")
-                        time.sleep(0.1)  # Wait for 0.1s before retrying
-                        continue
-                    measurements.append(value)
+                    measurements.append(read_measurement(s, i, cadence))
                 except ValueError:
                     print(f"Failed to parse measurement {i}")
                     measurements.append(None)
 
-            if len(measurements) == 5:
+            if NOT_READY in measurements:
+                print("Measurement not ready, skipping ...")
+            elif None in measurements or cadence.observe(measurements, read_start) or cadence.unchanged_due(time.time()):
+                # Values the scope has not updated yet are only logged again once per cadence.max_period,
+                # a sample with an unparsable value is logged but says nothing about when the scope updates
+                if None not in measurements and cadence.stale:
+                    print(f"Measurements unchanged for {time.time() - cadence.last_new:.1f} s, scope may be stopped")
                 print(f"{now:.6f}: Vrms: {measurements[0]} V, IRMS: {measurements[1]} A, "
                       f"Freq: {measurements[2]} Hz, Phase: {measurements[3]} deg, "
                       f"Impedance: {measurements[4]}")
                 csvwriter.writerow([now] + measurements)
+                if telemetry is not None:
+                    telemetry.publish(now, measurements)
 
-            time.sleep(0.01)  # Wait briefly between measurements
+            cadence.wait()  # Sleep until the scope's next measurement update is due
         except Exception as e:
             print(f"Error during measurement acquisition: {e}")
 
@@ -166,6 +193,8 @@ except Exception as e:
     print(f"Error stopping acquisition: {e}")
 
 s.close()
+if telemetry is not None:
+    telemetry.close()
 
 def add_column_v_over_i(input_file, output_file): # Calculates and adds a column for V/I (Impedance) in the CSV file.
     with open(input_file, 'r') as csvfile:
@@ -11,6 +11,8 @@ import time
 from datetime import datetime
 import os
 import re
+import hashlib
+from telemetryStream import TelemetryPublisher, ask_telemetry_port
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -21,6 +23,7 @@ IP = "192.168.1.2"
 #IP = "169.254.213.237"
 PORT = 4000
 INPUT_BUFFER = 2 * 1024
+FRAME_INDEX = "index.csv"  # Maps test time to the screenshot showing the display at that time
 RUN = True  # The loop runs until the user presses Ctrl-C
 
 def main():
@@ -29,6 +32,7 @@ def main():
     if filename is None:
         print("Filename generation failed. Exiting.")
         return
+    telemetry_port = ask_telemetry_port()  # Each recording running at the same time needs its own port
     
     folder_name = create_folder_for_files(filename)
     # Save the last filename used
@@ -47,9 +51,9 @@ def main():
     driver.get('http://192.168.1.2:81')  # Assuming this is the oscilloscope web interface
 
     if offset_use:
-        connect_and_acquire_with_offset(driver, os.path.join(folder_name, filename), casenum, peakC, trackingPeriod)
+        connect_and_acquire_with_offset(driver, os.path.join(folder_name, filename), casenum, peakC, trackingPeriod, telemetry_port)
     else:
-        connect_and_acquire_without_offset(driver, os.path.join(folder_name, filename), casenum, peakC, trackingPeriod)
+        connect_and_acquire_without_offset(driver, os.path.join(folder_name, filename), casenum, peakC, trackingPeriod, telemetry_port)
     
     driver.quit()  # Quit the driver at the end
 def file_naming():
@@ -148,7 +152,7 @@ def signal_handler(signum, frame):
     print(f"Signal {signal.strsignal(signum)} received ... stopping")
     RUN = False
 
-def connect_and_acquire_with_offset(driver, filename, casenum, peakC, trackingPeriod):
+def connect_and_acquire_with_offset(driver, filename, casenum, peakC, trackingPeriod, telemetry_port):
     """Connect to oscilloscope and acquire data with offset."""
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     print(f"Connecting to {IP}, port {PORT} ...")
@@ -165,12 +169,12 @@ def connect_and_acquire_with_offset(driver, filename, casenum, peakC, trackingPe
         csvwriter.writerow(['Time (s)', 'Case Number', 'Peak Current', 'Voltage (V RMS)', 'Current (A RMS)', 
                             'Frequency (Hz)', 'Phase (deg)', 'Math Function (Ohms)', 'Offset'])
 
-        acquire_data_loop(driver, s, csvwriter, filename, casenum, peakC, offset_value, True, trackingPeriod)
+        acquire_data_loop(driver, s, csvwriter, filename, casenum, peakC, offset_value, True, trackingPeriod, telemetry_port)
 
     send_command(s, "ACQuire:STATE STOP")
     s.close()
 
-def connect_and_acquire_without_offset(driver, filename, casenum, peakC, trackingPeriod):
+def connect_and_acquire_without_offset(driver, filename, casenum, peakC, trackingPeriod, telemetry_port):
     """Connect to oscilloscope and acquire data without offset."""
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     print(f"Connecting to {IP}, port {PORT} ...")
@@ -186,7 +190,7 @@ def connect_and_acquire_without_offset(driver, filename, casenum, peakC, trackin
         csvwriter.writerow(['Time (s)', 'Case Number', 'Peak Current', 'Voltage (V RMS)', 'Current (A RMS)', 
                             'Frequency (Hz)', 'Phase (deg)', 'Math Function (Ohms)'])
 
-        acquire_data_loop(driver, s, csvwriter, filename, casenum, peakC, None, False, trackingPeriod)
+        acquire_data_loop(driver, s, csvwriter, filename, casenum, peakC, None, False, trackingPeriod, telemetry_port)
 
     send_command(s, "ACQuire:STATE STOP")
     s.close()
@@ -208,7 +212,7 @@ def recv_data(s):
         print(f"Error receiving data: {e}")
         return None
 
-def acquire_data_loop(driver, s, csvwriter, filename, casenum, peakC, offset_value, offset_enabled, trackingPeriod):
+def acquire_data_loop(driver, s, csvwriter, filename, casenum, peakC, offset_value, offset_enabled, trackingPeriod, telemetry_port):
 
     """Loop to acquire data from the oscilloscope and write it to CSV."""
     signal.signal(signal.SIGINT, signal_handler)
@@ -237,28 +241,54 @@ def acquire_data_loop(driver, s, csvwriter, filename, casenum, peakC, offset_val
         print(f"Failed to create folder {pictures_folder}: {e}")
         return  # Exit if folder creation fails
 
-    while RUN and (time.time() - record_start_time < trackingPeriod):
-        meas1, meas2, meas3, meas4, meas5 = fetch_measurements(s)
-        now = time.time() - start_time
-
-        # Inside acquire_data_loop, use offset_enabled to check the condition
-        if offset_enabled:
-            print(f"{now:.2f}: Voltage: {meas1} V RMS, Current: {meas2} A RMS, Frequency: {meas3} Hz, "
-                f"Phase: {meas4} deg, Math Function: {meas5} Ohms, Offset: {offset_value}")
-            csvwriter.writerow([now - 5, casenum, peakC, meas1, meas2, meas3, meas4, meas5, offset_value])
-        else:
-            print(f"{now:.2f}: Voltage: {meas1} V RMS, Current: {meas2} A RMS, Frequency: {meas3} Hz, "
-                f"Phase: {meas4} deg, Math Function: {meas5} Ohms")
-            csvwriter.writerow([now - 5, casenum, peakC, meas1, meas2, meas3, meas4, meas5])
-
-        # Take screenshot with incremented filename
-        timestamp = f"{now:.0f}s"
+    try:
+        telemetry = TelemetryPublisher(port=telemetry_port)  # Live samples for local dashboards, see telemetryStream.py
+    except OSError as e:
+        print(f"Telemetry stream unavailable: {e}")
+        telemetry = None
+
+    # Frames identical to the previous one are not saved again, the index points back to the last saved frame
+    with open(os.path.join(pictures_folder, FRAME_INDEX), 'w', newline='') as index_file:
+        index_writer = csv.writer(index_file)
+        index_writer.writerow(['Time (s)', 'Frame', 'SHA1'])
+        last_frame = None
+        last_digest = None
+
+        while RUN and (time.time() - record_start_time < trackingPeriod):
+            meas1, meas2, meas3, meas4, meas5 = fetch_measurements(s)
+            now = time.time() - start_time
+
+            # Inside acquire_data_loop, use offset_enabled to check the condition
+            if offset_enabled:
+                print(f"{now:.2f}: Voltage: {meas1} V RMS, Current: {meas2} A RMS, Frequency: {meas3} Hz, "
+                    f"Phase: {meas4} deg, Math Function: {meas5} Ohms, Offset: {offset_value}")
+                csvwriter.writerow([now - 5, casenum, peakC, meas1, meas2, meas3, meas4, meas5, offset_value])
+            else:
+                print(f"{now:.2f}: Voltage: {meas1} V RMS, Current: {meas2} A RMS, Frequency: {meas3} Hz, "
+                    f"Phase: {meas4} deg, Math Function: {meas5} Ohms")
+                csvwriter.writerow([now - 5, casenum, peakC, meas1, meas2, meas3, meas4, meas5])
+            if telemetry is not None:
+                telemetry.publish(now - 5, [meas1, meas2, meas3, meas4, meas5])
+
+            # Take screenshot with incremented filename
+            timestamp = f"{now:.0f}s"
+
+            screenshot_filename = os.path.join(pictures_folder, f'picture_{screenshot_counter}_TestTime={timestamp}.png')
+            digest = take_screenshot(driver, screenshot_filename, last_digest)
+            if digest is None:
+                index_writer.writerow([now - 5, '', ''])  # Screenshot failed, display state at this time unknown
+            else:
+                if digest != last_digest:
+                    last_frame = os.path.basename(screenshot_filename)
+                    last_digest = digest
+                    screenshot_counter += 1
+                index_writer.writerow([now - 5, last_frame, last_digest])
+            index_file.flush()
 
-        screenshot_filename = os.path.join(pictures_folder, f'picture_{screenshot_counter}_TestTime={timestamp}.png')
-        take_screenshot(driver, screenshot_filename) 
-        screenshot_counter += 1
+            time.sleep(1)
 
-        time.sleep(1)
+    if telemetry is not None:
+        telemetry.close()
 
 def fetch_measurements(s):
     """Fetch measurements from the oscilloscope."""
@@ -288,13 +318,28 @@ def fetch_measurements(s):
     return meas1, meas2, meas3, meas4, meas5
 
 
-def take_screenshot(driver, screenshot_filename):
-    """Take a screenshot using the provided WebDriver and save it to the given filename."""
+def take_screenshot(driver, screenshot_filename, last_digest=None):
+    """
+    Take a screenshot using the provided WebDriver and save it to the given filename.
+    The frame is only written if it differs from the one with last_digest. Returns the frame's digest.
+    """
     try: 
-        driver.save_screenshot(screenshot_filename)
-        print(f"Screenshot saved as {screenshot_filename}")
+        png = driver.get_screenshot_as_png()
     except Exception as e:
         print(f"Error taking screenshot: {e}")
+        return None
+    digest = hashlib.sha1(png).hexdigest()
+    if digest == last_digest:
+        print("Display unchanged, screenshot not saved")
+        return digest
+    try:
+        with open(screenshot_filename, 'wb') as f:
+            f.write(png)
+        print(f"Screenshot saved as {screenshot_filename}")
+    except OSError as e:
+        print(f"Error saving screenshot: {e}")
+        return None
+    return digest
     
 def create_folder_for_files(filename):
     """Create a folder based on the filename (excluding the .csv extension)."""
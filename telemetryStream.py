@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Live telemetry stream of Tektronix 3-Series MDO samples to local subscribers.
+
+The acquisition loop hands each sample to TelemetryPublisher.publish, which only queues it.
+A background thread packs queued samples into binary batches and sends them to every
+connected subscriber, so any number of dashboards and loggers can watch one scope without
+opening their own SCPI connection.
+
+Each batch is sent as a 4-byte little-endian length followed by the payload:
+    header  '<4sBH'  magic b'TEKS', version, number of samples
+    sample  '<6d'    time (s), Vrms, Irms, frequency, phase, impedance (NaN if missing)
+
+Run this file to print the stream of a recording on this machine, it waits for the recording to start:
+    python telemetryStream.py [host] [port]
+"""
+
+import math
+import queue
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+
+TELEMETRY_HOST = "127.0.0.1"  # Local subscribers only
+TELEMETRY_PORT = 5555
+MAGIC = b'TEKS'
+VERSION = 1
+LENGTH = struct.Struct('<I')
+HEADER = struct.Struct('<4sBH')
+SAMPLE = struct.Struct('<6d')
+BATCH_SIZE = 50  # Samples per batch at most
+BATCH_DELAY = 0.05  # Seconds a sample may wait for its batch to fill
+QUEUE_SIZE = 10000  # Samples held for the sender thread before new ones are dropped
+SEND_TIMEOUT = 0.5  # Subscribers that cannot take a batch within this are disconnected
+CONNECT_RETRY = 1  # Seconds between attempts of a subscriber to reach a publisher that is not running yet
+
+def ask_telemetry_port():
+    """Prompt for the port to stream on, so concurrent recordings can each use their own."""
+    while True:
+        answer = input(f"Enter telemetry port (Enter for {TELEMETRY_PORT}): ").strip()
+        if not answer:
+            return TELEMETRY_PORT
+        try:
+            port = int(answer)
+            if 0 < port < 65536:
+                return port
+        except ValueError:
+            pass
+        print("Invalid input! Please enter a port number between 1 and 65535.")
+
+def pack_batch(samples):
+    """Pack a list of (time, measurements) samples into one binary batch, length prefix included."""
+    payload = [HEADER.pack(MAGIC, VERSION, len(samples))]
+    for timestamp, measurements in samples:
+        values = [float('nan') if value is None else float(value) for value in measurements]
+        payload.append(SAMPLE.pack(timestamp, *values))
+    payload = b''.join(payload)
+    return LENGTH.pack(len(payload)) + payload
+
+def unpack_batch(payload):
+    """Unpack a batch payload (without its length prefix) into a list of (time, measurements) samples."""
+    magic, version, count = HEADER.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a telemetry batch (magic {magic!r}, version {version})")
+    samples = []
+    for i in range(count):
+        timestamp, *measurements = SAMPLE.unpack_from(payload, HEADER.size + i * SAMPLE.size)
+        samples.append((timestamp, [None if math.isnan(value) else value for value in measurements]))
+    return samples
+
+class TelemetryPublisher:
+    """Publishes samples to every subscriber connected to host:port, without blocking the caller."""
+
+    def __init__(self, host=TELEMETRY_HOST, port=TELEMETRY_PORT):
+        self.samples = queue.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers = []
+        self.dropped = 0
+        self.running = True
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if hasattr(socket, 'SO_EXCLUSIVEADDRUSE'):  # Windows lets a second process bind the port otherwise
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:  # Rebind straight after a previous recording, POSIX still refuses a second live listener
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.server.bind((host, port))
+        except OSError:
+            self.server.close()
+            raise
+        self.server.listen()
+        self.address = self.server.getsockname()
+        self.thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self.thread.start()
+        print(f"Streaming telemetry on {self.address[0]}:{self.address[1]}")
+
+    def publish(self, timestamp, measurements):
+        """Queue one sample for the subscribers. Drops it if the sender thread has fallen behind."""
+        try:
+            self.samples.put_nowait((timestamp, measurements))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Send any queued samples, then disconnect the subscribers."""
+        self.running = False
+        self.thread.join()
+        if self.dropped:
+            print(f"Telemetry dropped {self.dropped} samples")
+
+    def _run(self):
+        while self.running or not self.samples.empty():
+            try:
+                self._accept()
+                batch = self._collect()
+                if batch:
+                    self._send(pack_batch(batch))
+            except Exception as e:  # Keep draining the queue, the recording does not depend on the stream
+                print(f"Telemetry error: {e}")
+                time.sleep(BATCH_DELAY)
+        for subscriber in self.subscribers:
+            subscriber.close()
+        self.server.close()
+
+    def _accept(self):
+        """Accept any subscribers waiting to connect."""
+        while select.select([self.server], [], [], 0)[0]:
+            try:
+                subscriber, address = self.server.accept()
+            except OSError as e:  # e.g. the subscriber gave up before it was accepted
+                print(f"Telemetry subscriber failed to connect: {e}")
+                continue
+            subscriber.settimeout(SEND_TIMEOUT)
+            self.subscribers.append(subscriber)
+            print(f"Telemetry subscriber connected from {address[0]}:{address[1]}")
+
+    def _collect(self):
+        """Wait up to BATCH_DELAY for samples and return up to BATCH_SIZE of them."""
+        batch = []
+        deadline = time.time() + BATCH_DELAY
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(self.samples.get(timeout=max(deadline - time.time(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, data):
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.sendall(data)
+            except OSError as e:  # Includes timeouts of subscribers that stopped reading
+                print(f"Telemetry subscriber disconnected: {e}")
+                subscriber.close()
+                self.subscribers.remove(subscriber)
+
+def subscribe(host=TELEMETRY_HOST, port=TELEMETRY_PORT, wait=False):
+    """
+    Connect to a publisher and yield each batch of (time, measurements) samples until it closes.
+    With wait, keep retrying until the publisher is running instead of raising ConnectionRefusedError.
+    """
+    while True:
+        try:
+            s = socket.create_connection((host, port))
+            break
+        except ConnectionRefusedError:
+            if not wait:
+                raise
+            time.sleep(CONNECT_RETRY)
+    with s:
+        while True:
+            length = _recv_exactly(s, LENGTH.size)
+            if length is None:
+                return
+            payload = _recv_exactly(s, LENGTH.unpack(length)[0])
+            if payload is None:
+                return
+            yield unpack_batch(payload)
+
+def _recv_exactly(s, size):
+    data = b''
+    while len(data) < size:
+        chunk = s.recv(size - len(data))
+        if not chunk:
+            return None  # Publisher closed the stream
+        data += chunk
+    return data
+
+
+if __name__ == "__main__":
+    host = sys.argv[1] if len(sys.argv) > 1 else TELEMETRY_HOST
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else TELEMETRY_PORT
+    print(f"Waiting for telemetry stream on {host}:{port} ... (Ctrl-C to stop)")
+    try:
+        for batch in subscribe(host, port, wait=True):
+            for timestamp, (vrms, irms, freq, phase, impedance) in batch:
+                print(f"{timestamp:.6f}: Vrms: {vrms} V, IRMS: {irms} A, "
+                      f"Freq: {freq} Hz, Phase: {phase} deg, Impedance: {impedance}")
+    except KeyboardInterrupt:
+        pass
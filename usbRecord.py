@@ -6,6 +6,9 @@ import csv
 import time
 from datetime import datetime as dt
 import re
+import math
+from adaptiveSampling import MeasurementCadence, parse_horizontal_scale, NOT_READY
+from telemetryStream import TelemetryPublisher, ask_telemetry_port
 
 
 instrumentIds = ["USB0::0x0699::0x052C::C053930::INSTR","USB0::0x0699::0x052C::C018620::INSTR"] #EQ068 and EQ031 Instrument IDs
@@ -25,6 +28,7 @@ if logfile == '.csv':
     logfile = f'{now} log.csv' # Name of .csv file the data gets logged into.
 logfile = re.sub(r'[\/:*?"<>|]', '-', logfile)
 print(f"Logfile name set to: {logfile}")
+telemetryPort = ask_telemetry_port()  # Each recording running at the same time needs its own port
 reconnectDelay = 5
 
 
@@ -54,6 +58,20 @@ def waitForTrigger(scope):
     return triggerStatus
 
 maxRetries = 5  
+notReadyRetries = 5  # Reads of a not ready measurement before the sample is skipped
+
+def readMeasurement(scope, i, cadence):
+    """ Read MEAS<i>, retrying briefly while the oscilloscope reports it not ready. """
+    query = f"MEASUREMENT:MEAS{i}:VALUE?"
+    for attempt in range(notReadyRetries):
+        response = scope.query(query).strip()
+        if isinstance(response, bytes):
+            response = response.decode('utf-8')
+        value = float(response)
+        if value != NOT_READY:
+            return value
+        time.sleep(cadence.retry_interval())  # Wait a fraction of the update period before retrying
+    return NOT_READY
 
 def connect_to_scope(instrument_ids):
     """ Attempt to connect to the oscilloscope from the list of instrument IDs. """
@@ -135,6 +153,22 @@ for command in commands:
     except Exception as e:
         print(f"Failed to send command {command.strip()}: {e}")
 
+# Measurements update once per acquisition, learn the update period starting from the horizontal scale
+try:
+    horizontalScale = parse_horizontal_scale(scope.query(":HORIZONTAL:SCALE?"))
+except (pyvisa.VisaIOError, pyvisa.VisaError) as e:
+    print(f"Failed to query horizontal scale: {e}")
+    horizontalScale = parse_horizontal_scale(None)
+cadence = MeasurementCadence(horizontalScale)
+print(f"Initial measurement period: {cadence.period:.3f} s")
+
+# Start the stream before waiting for the trigger, so subscribers started early can connect
+try:
+    telemetry = TelemetryPublisher(port=telemetryPort)  # Live samples for local dashboards, see telemetryStream.py
+except OSError as e:
+    print(f"Telemetry stream unavailable: {e}")
+    telemetry = None
+
 print("Waiting for Trigger to be triggered")
 print("Press Ctrl-C at any time to stop ...") ####### USER CAN STOP THE SCRIPT BY PRESSING 'Ctrl' AND 'C' ########
 
@@ -153,13 +187,13 @@ with open(logfile, 'w', newline='') as csvfile:
     startTime = time.time()
     
     while run and (time.time() - startTime) <= testTime:
-        now = time.time() - startTime
+        readStart = time.time()  # Updates are timed from the start of the read that found them
+        now = readStart - startTime
         try:
             measurements = []
             for i in range(1, 6):
-                query = f"MEASUREMENT:MEAS{i}:VALUE?"
                 try:
-                    response = scope.query(query).strip()  # <-- Inserted try-except for connection loss
+                    value = readMeasurement(scope, i, cadence)  # <-- Inserted try-except for connection loss
                 except (pyvisa.VisaIOError, pyvisa.VisaError) as e:
                     print(f"Connection lost: {e}")
                     scope = reconnect_scope(scope, instrumentIds)
@@ -168,29 +202,30 @@ with open(logfile, 'w', newline='') as csvfile:
                         run = False
                         break
                     continue
-                
-                try:
-                    if isinstance(response, bytes):
-                        value = float(response.decode('utf-8'))
-                    else:
-                        value = float(response)
-                    if value == 9.91e+37:  # NAN value from oscilloscope indicates measurement not ready
-                        print("Measurement not ready, skipping ...")
-                        time.sleep(0.1)  # Wait for 0.1s before retrying
-                        continue
-                    measurements.append(value)
-                except ValueError:
-                    print(f"Invalid response '{response}' from {query}, logging as NaN.")
+                except ValueError as e:
+                    print(f"Invalid response from MEAS{i}: {e}, logging as NaN.")
                     value = float('nan')
 
-            if len(measurements) == 5:
+                if value == NOT_READY:
+                    print("Measurement not ready, skipping ...")
+                    break
+                measurements.append(value)
+
+            # Values the scope has not updated yet are only logged again once per cadence.max_period,
+            # a sample with an unparsable (NaN) value is logged but says nothing about when the scope updates
+            invalid = any(math.isnan(value) for value in measurements)
+            if len(measurements) == 5 and (invalid or cadence.observe(measurements, readStart) or cadence.unchanged_due(time.time())):
+                if not invalid and cadence.stale:
+                    print(f"Measurements unchanged for {time.time() - cadence.last_new:.1f} s, scope may be stopped")
                 print(f"{now:.6f}: Vrms: {measurements[0]} V, IRMS: {measurements[1]} A, "
                       f"Freq: {measurements[2]} Hz, Phase: {measurements[3]} deg, "
                       f"Impedance: {measurements[4]}")
                 csvwriter.writerow([now] + measurements)
                 csvfile.flush()  # Ensure data is written to disk
+                if telemetry is not None:
+                    telemetry.publish(now, measurements)
 
-            time.sleep(0.01)
+            cadence.wait()  # Sleep until the scope's next measurement update is due
         except Exception as e:
             print(f"Error during measurement acquisition: {e}")
 
@@ -201,6 +236,8 @@ except Exception as e:
     print(f"Error stopping acquisition: {e}")
 
 scope.close()
+if telemetry is not None:
+    telemetry.close()
 
 def addColumnVOverI(inputFile, outputFile):
     with open(inputFile, 'r') as csvfile: